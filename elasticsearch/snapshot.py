@@ -5,9 +5,9 @@ Elasticsearch snapshot and cleanup tool designed for Kubernetes environments.
 Reads configuration from environment variables, creates snapshots and automatically cleans up expired snapshots.
 """
 
-import asyncio
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add src to path for development
@@ -17,8 +17,9 @@ if src_path.exists():
 
 from core.rotation import SnapshotRotation
 from core.snapshot import ElasticsearchSnapshot
-from models.config import SnapshotConfig
+from models.config import SnapshotConfig, get_snapshot_config, missing_env_vars
 from utils.logging import get_logger, setup_logging
+from utils.runner import run_async
 
 logger = get_logger(__name__)
 
@@ -30,16 +31,49 @@ class SnapshotManager:
         """Initialize snapshot manager"""
         self.config = self._load_config_from_env()
         setup_logging(level=os.getenv("LOG_LEVEL", "INFO"))
+        self._snapshot_handler: ElasticsearchSnapshot | None = None
+        self._rotation_handler: SnapshotRotation | None = None
+
+    async def __aenter__(self) -> "SnapshotManager":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def _get_snapshot_handler(self) -> ElasticsearchSnapshot:
+        """Get the connected snapshot handler, creating it on first use"""
+        if self._snapshot_handler is None:
+            handler = ElasticsearchSnapshot(self.config)
+            await handler.connect()
+            await handler.create_repository()
+            self._snapshot_handler = handler
+        return self._snapshot_handler
+
+    async def _get_rotation_handler(self) -> SnapshotRotation:
+        """Get a rotation handler sharing the snapshot handler's connection"""
+        if self._rotation_handler is None:
+            snapshot_handler = await self._get_snapshot_handler()
+            handler = SnapshotRotation(self.config)
+            handler.es_client = snapshot_handler.es_client
+            self._rotation_handler = handler
+        return self._rotation_handler
+
+    async def close(self) -> None:
+        """Close the shared Elasticsearch connection"""
+        if self._snapshot_handler is not None:
+            await self._snapshot_handler.close()
+        self._snapshot_handler = None
+        self._rotation_handler = None
 
     def _load_config_from_env(self) -> SnapshotConfig:
         """Load configuration from environment variables"""
         try:
-            # Create config object, Pydantic will automatically read from environment variables
-            config = SnapshotConfig()
+            # Pydantic reads environment variables; the result is cached per process
+            config = get_snapshot_config()
             logger.info("Configuration loaded successfully")
             return config
         except Exception as e:
-            logger.error(f"Failed to load configuration: {e}")
+            logger.error("Failed to load configuration: %s", e)
             raise
 
     async def create_snapshot(self) -> str:
@@ -48,20 +82,20 @@ class SnapshotManager:
             logger.info("Starting snapshot creation...")
 
             # Display snapshot information
-            logger.info(f"Snapshot cluster: {self.config.snapshot_hosts_list}")
-            logger.info(f"Indices: {self.config.indices_list}")
-            logger.info(f"S3 bucket: {self.config.bucket_name}")
-            logger.info(f"Repository: {self.config.repository_name}")
+            logger.info("Snapshot cluster: %s", self.config.snapshot_hosts_list)
+            logger.info("Indices: %s", self.config.indices_list)
+            logger.info("S3 bucket: %s", self.config.bucket_name)
+            logger.info("Repository: %s", self.config.repository_name)
 
             # Create snapshot
-            snapshot_handler = ElasticsearchSnapshot(self.config)
-            snapshot_name = await snapshot_handler.snapshot()
+            snapshot_handler = await self._get_snapshot_handler()
+            snapshot_name = await snapshot_handler.create_snapshot()
 
-            logger.info(f"Snapshot created successfully: {snapshot_name}")
+            logger.info("Snapshot created successfully: %s", snapshot_name)
             return snapshot_name
 
         except Exception as e:
-            logger.error(f"Failed to create snapshot: {e}")
+            logger.error("Failed to create snapshot: %s", e)
             raise
 
     async def cleanup_old_snapshots(self) -> dict:
@@ -70,27 +104,29 @@ class SnapshotManager:
             logger.info("Starting cleanup of expired snapshots...")
 
             # Display cleanup strategy
-            logger.info(f"Max snapshots to keep: {self.config.max_snapshots}")
-            logger.info(f"Max age in days: {self.config.max_age_days}")
+            logger.info("Max snapshots to keep: %s", self.config.max_snapshots)
+            logger.info("Max age in days: %s", self.config.max_age_days)
             logger.info(
-                f"Keep successful snapshots only: {self.config.keep_successful_only}"
+                "Keep successful snapshots only: %s", self.config.keep_successful_only
             )
 
             # Execute rotation cleanup
-            rotation_handler = SnapshotRotation(self.config)
-            result = await rotation_handler.rotate(
+            rotation_handler = await self._get_rotation_handler()
+            result = await rotation_handler.rotate_snapshots(
                 max_snapshots=self.config.max_snapshots,
                 max_age_days=self.config.max_age_days,
                 keep_successful_only=self.config.keep_successful_only,
             )
 
             logger.info(
-                f"Snapshot cleanup completed: deleted {result['total_deleted']}, kept {result['total_kept']}"
+                "Snapshot cleanup completed: deleted %s, kept %s",
+                result["total_deleted"],
+                result["total_kept"],
             )
             return result
 
         except Exception as e:
-            logger.error(f"Failed to cleanup snapshots: {e}")
+            logger.error("Failed to cleanup snapshots: %s", e)
             raise
 
     async def run_snapshot_and_cleanup(self) -> dict:
@@ -109,18 +145,18 @@ class SnapshotManager:
                 "success": True,
                 "snapshot_name": snapshot_name,
                 "cleanup_result": cleanup_result,
-                "timestamp": asyncio.get_event_loop().time(),
+                "timestamp": time.monotonic(),
             }
 
             logger.info("Snapshot and cleanup workflow completed successfully")
             return result
 
         except Exception as e:
-            logger.error(f"Snapshot and cleanup workflow failed: {e}")
+            logger.error("Snapshot and cleanup workflow failed: %s", e)
             result = {
                 "success": False,
                 "error": str(e),
-                "timestamp": asyncio.get_event_loop().time(),
+                "timestamp": time.monotonic(),
             }
             return result
 
@@ -129,26 +165,16 @@ async def main():
     """Main function"""
     try:
         # Check required environment variables
-        required_env_vars = [
-            "SNAPSHOT_HOSTS",
-            "ES_REPOSITORY_NAME",
-            "ES_INDICES",
-            "S3_BUCKET_NAME",
-            "S3_REGION",
-            "AWS_ACCESS_KEY_ID",
-            "AWS_SECRET_ACCESS_KEY",
-        ]
-
-        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+        missing_vars = missing_env_vars()
         if missing_vars:
-            logger.error(f"Missing required environment variables: {missing_vars}")
+            logger.error(
+                "Missing required environment variables: %s", ", ".join(missing_vars)
+            )
             sys.exit(1)
 
-        # Create snapshot manager
-        manager = SnapshotManager()
-
-        # Execute snapshot and cleanup workflow
-        result = await manager.run_snapshot_and_cleanup()
+        # Create snapshot manager and execute snapshot and cleanup workflow
+        async with SnapshotManager() as manager:
+            result = await manager.run_snapshot_and_cleanup()
 
         # Output result
         if result["success"]:
@@ -162,10 +188,10 @@ async def main():
             sys.exit(1)
 
     except Exception as e:
-        logger.error(f"Program execution failed: {e}")
+        logger.error("Program execution failed: %s", e)
         print(f"ERROR: {e}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_async(main())
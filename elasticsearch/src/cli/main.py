@@ -1,13 +1,18 @@
 """Main CLI entry point for the backup toolkit."""
 
 import asyncio
+import fnmatch
+import re
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, time
+from functools import lru_cache
 from pathlib import Path
 
 import click
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
+from rich.progress import Progress
 from rich.table import Table
 
 from core.restore import ElasticsearchRestore
@@ -20,11 +25,18 @@ from utils.config_loader import (
     save_sample_config,
 )
 from utils.logging import get_logger, setup_logging
+from utils.runner import run_async
 
 console = Console()
 logger = get_logger(__name__)
 
 
+@lru_cache(maxsize=128)
+def _compile_globs(patterns: tuple[str, ...]) -> re.Pattern:
+    """Compile shell-style globs into a single anchored alternation regex."""
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+
 @click.group()
 @click.option(
     "--config",
@@ -137,7 +149,7 @@ def snapshot(config: SnapshotConfig | None) -> None:
             console.print(f"[red]快照失败: {e}[/red]")
             sys.exit(1)
 
-    asyncio.run(run_snapshot())
+    run_async(run_snapshot())
 
 
 @cli.command()
@@ -168,7 +180,7 @@ def restore(config: SnapshotConfig, snapshot_name: str) -> None:
             console.print(f"[red]恢复失败: {e}[/red]")
             sys.exit(1)
 
-    asyncio.run(run_restore())
+    run_async(run_restore())
 
 
 @cli.command()
@@ -178,54 +190,46 @@ def list_snapshots(config: SnapshotConfig) -> None:
 
     async def run_list() -> None:
         try:
-            restore_handler = ElasticsearchRestore(config)
-            await restore_handler.connect()
-            await restore_handler.create_repository()
+            async with ElasticsearchRestore(config) as restore_handler:
+                await restore_handler.ensure_repository(create_if_missing=False)
 
-            snapshots = await restore_handler.list_snapshots()
+                snapshots = await restore_handler.list_snapshots()
 
-            if not snapshots:
-                console.print("[yellow]未找到快照[/yellow]")
-                return
+                if not snapshots:
+                    console.print("[yellow]未找到快照[/yellow]")
+                    return
 
-            # Create table
-            table = Table(title=f"快照列表 - {config.repository_name}")
-            table.add_column("快照名称", style="cyan")
-            table.add_column("状态", style="green")
-            table.add_column("开始时间", style="yellow")
-            table.add_column("结束时间", style="yellow")
-            table.add_column("索引数量", style="blue")
-
-            for snapshot in snapshots:
-                state = snapshot.get("state", "UNKNOWN")
-                start_time = snapshot.get("start_time", "")
-                end_time = snapshot.get("end_time", "")
-                indices = len(snapshot.get("indices", []))
-
-                # Format timestamps
-                if start_time:
-                    start_time = start_time.split("T")[0]  # Just the date
-                if end_time:
-                    end_time = end_time.split("T")[0]  # Just the date
-
-                table.add_row(
-                    snapshot.get("snapshot", "UNKNOWN"),
-                    state,
-                    start_time,
-                    end_time,
-                    str(indices),
+                # Create table
+                table = Table(title=f"快照列表 - {config.repository_name}")
+                table.add_column("快照名称", style="cyan")
+                table.add_column("状态", style="green")
+                table.add_column("开始时间", style="yellow")
+                table.add_column("结束时间", style="yellow")
+                table.add_column("索引数量", style="blue")
+
+                # 时间只保留日期部分 (ISO 格式前 10 个字符)
+                rows = (
+                    (
+                        snapshot.get("snapshot", "UNKNOWN"),
+                        snapshot.get("state", "UNKNOWN"),
+                        snapshot.get("start_time", "")[:10],
+                        snapshot.get("end_time", "")[:10],
+                        str(len(snapshot.get("indices", ()))),
+                    )
+                    for snapshot in snapshots
                 )
 
-            console.print(table)
+                # 边添加边渲染，快照很多时第一行也能立即显示
+                with Live(table, console=console, refresh_per_second=4):
+                    for row in rows:
+                        table.add_row(*row)
 
         except Exception as e:
             logger.error(f"列出快照失败: {e}")
             console.print(f"[red]列出快照失败: {e}[/red]")
             sys.exit(1)
-        finally:
-            await restore_handler.close()
 
-    asyncio.run(run_list())
+    run_async(run_list())
 
 
 @cli.command()
@@ -283,59 +287,9 @@ def rotate(
             if dry_run:
                 # 模拟运行，只显示将要删除的快照
                 snapshots = await rotation_handler.list_snapshots()
-                valid_snapshots = []
-
-                for snapshot in snapshots:
-                    snapshot_name = snapshot.get("snapshot", "")
-                    state = snapshot.get("state", "")
-
-                    if keep_successful_only and state != "SUCCESS":
-                        continue
-
-                    snapshot_date = rotation_handler.parse_snapshot_date(snapshot_name)
-                    if snapshot_date is None:
-                        continue
-
-                    valid_snapshots.append(
-                        {
-                            "name": snapshot_name,
-                            "date": snapshot_date,
-                            "state": state,
-                        }
-                    )
-
-                valid_snapshots.sort(key=lambda x: x["date"], reverse=True)
-                cutoff_date = datetime.now() - timedelta(days=max_age_days)
-
-                snapshots_to_delete = []
-                snapshots_to_keep = []
-
-                for i, snapshot in enumerate(valid_snapshots):
-                    should_delete = False
-                    reason = ""
-
-                    if i >= max_snapshots:
-                        should_delete = True
-                        reason = f"超过最大快照数限制 ({max_snapshots})"
-                    elif snapshot["date"] < cutoff_date:
-                        should_delete = True
-                        reason = f"超过 {max_age_days} 天"
-
-                    if should_delete:
-                        snapshots_to_delete.append(
-                            {
-                                "name": snapshot["name"],
-                                "date": snapshot["date"],
-                                "reason": reason,
-                            }
-                        )
-                    else:
-                        snapshots_to_keep.append(
-                            {
-                                "name": snapshot["name"],
-                                "date": snapshot["date"],
-                            }
-                        )
+                snapshots_to_keep, snapshots_to_delete = rotation_handler.plan_rotation(
+                    snapshots, max_snapshots, max_age_days, keep_successful_only
+                )
 
                 # 显示结果
                 if snapshots_to_delete:
@@ -344,7 +298,8 @@ def rotate(
                     )
                     for snapshot in snapshots_to_delete:
                         console.print(
-                            f"  - {snapshot['name']} ({snapshot['date'].strftime('%Y-%m-%d %H:%M:%S')}) - {snapshot['reason']}"
+                            f"  - {snapshot['name']} "
+                            f"({snapshot['date']:%Y-%m-%d %H:%M:%S}) - {snapshot['reason']}"
                         )
                 else:
                     console.print("[green]没有需要删除的快照[/green]")
@@ -355,7 +310,7 @@ def rotate(
                     )
                     for snapshot in snapshots_to_keep:
                         console.print(
-                            f"  - {snapshot['name']} ({snapshot['date'].strftime('%Y-%m-%d %H:%M:%S')})"
+                            f"  - {snapshot['name']} ({snapshot['date']:%Y-%m-%d %H:%M:%S})"
                         )
 
             else:
@@ -392,7 +347,7 @@ def rotate(
         finally:
             await rotation_handler.close()
 
-    asyncio.run(run_rotation())
+    run_async(run_rotation())
 
 
 @cli.command()
@@ -404,7 +359,9 @@ def rotate(
 )
 @click.option(
     "--pattern",
-    help="Delete snapshots matching the pattern (e.g., 'snapshot_2025_07_*')",
+    "patterns",
+    multiple=True,
+    help="Delete snapshots matching the pattern (e.g., 'snapshot_2025_07_*'); may be repeated",
 )
 @click.option(
     "--older-than",
@@ -425,24 +382,40 @@ def cleanup(
     config: SnapshotConfig,
     snapshot_names: tuple,
     all: bool,
-    pattern: str,
+    patterns: tuple[str, ...],
     older_than: str,
     dry_run: bool,
     force: bool,
 ) -> None:
     """清理指定的快照。"""
 
-    # 验证参数
-    if not snapshot_names and not all and not pattern and not older_than:
+    # 验证参数：在任何网络请求之前完成
+    selectors = sum(map(bool, (snapshot_names, all, patterns, older_than)))
+    if selectors == 0:
         console.print(
             "[red]错误: 必须指定要清理的快照名称、--all、--pattern 或 --older-than 参数[/red]"
         )
         sys.exit(1)
 
-    if all and (snapshot_names or pattern or older_than):
-        console.print("[red]错误: --all 参数不能与其他参数同时使用[/red]")
+    if selectors > 1:
+        console.print(
+            "[red]错误: 快照名称、--all、--pattern 和 --older-than 只能指定其中一个[/red]"
+        )
         sys.exit(1)
 
+    # 截止日期只解析一次
+    cutoff_ms = None
+    if older_than:
+        try:
+            cutoff_date = date.fromisoformat(older_than)
+        except ValueError as e:
+            console.print(f"[red]错误: 无效的日期格式 '{older_than}': {e}[/red]")
+            sys.exit(1)
+        cutoff_ms = int(datetime.combine(cutoff_date, time.min).timestamp() * 1000)
+
+    # fnmatch.translate 会转义所有特殊字符，生成的正则总是合法的
+    pattern_regex = _compile_globs(patterns) if patterns else None
+
     console.print(
         Panel.fit(
             f"[bold blue]开始快照清理操作[/bold blue]\n"
@@ -450,7 +423,7 @@ def cleanup(
             f"存储库: {config.repository_name}\n"
             f"指定快照: {snapshot_names if snapshot_names else '无'}\n"
             f"清理所有: {all}\n"
-            f"模式匹配: {pattern if pattern else '无'}\n"
+            f"模式匹配: {', '.join(patterns) if patterns else '无'}\n"
             f"早于日期: {older_than if older_than else '无'}\n"
             f"模拟运行: {dry_run}\n"
             f"强制删除: {force}",
@@ -458,70 +431,71 @@ def cleanup(
         )
     )
 
+    # 模拟运行且直接指定快照名称时，无需访问集群即可报告
+    if dry_run and snapshot_names:
+        requested = list(dict.fromkeys(snapshot_names))
+        console.print(f"[yellow]将要删除 {len(requested)} 个快照:[/yellow]")
+        for snapshot in requested:
+            console.print(f"  - {snapshot}")
+        console.print("[green]模拟运行完成，没有实际删除任何快照[/green]")
+        return
+
     async def run_cleanup() -> None:
         try:
-            import re
-            from datetime import datetime
-
-            from core.rotation import SnapshotRotation
-
             cleanup_handler = SnapshotRotation(config)
             await cleanup_handler.connect()
-            await cleanup_handler.create_repository()
+            # 模拟运行只读取快照，不注册存储库
+            if not dry_run:
+                await cleanup_handler.create_repository()
+
+            # 按日期清理时由 Elasticsearch 过滤，无需列出所有快照
+            by_date = cutoff_ms is not None
 
             # 获取所有快照
-            all_snapshots = await cleanup_handler.list_snapshots()
-            if not all_snapshots:
+            all_snapshots = (
+                [] if by_date else await cleanup_handler.list_snapshots(verbose=False)
+            )
+            if not by_date and not all_snapshots:
                 console.print("[yellow]存储库中没有快照[/yellow]")
                 return
 
+            # 快照名称只计算一次，集合用于 O(1) 成员检查
+            existing_snapshots = [s.get("snapshot", "") for s in all_snapshots]
+            existing_names = frozenset(existing_snapshots)
+
             # 确定要删除的快照
             snapshots_to_delete = []
 
             if all:
                 # 删除所有快照
-                snapshots_to_delete = [s.get("snapshot", "") for s in all_snapshots]
+                snapshots_to_delete = existing_snapshots
                 console.print(
                     f"[yellow]将要删除所有 {len(snapshots_to_delete)} 个快照[/yellow]"
                 )
 
             elif snapshot_names:
-                # 删除指定的快照
-                existing_snapshots = [s.get("snapshot", "") for s in all_snapshots]
-                for name in snapshot_names:
-                    if name in existing_snapshots:
-                        snapshots_to_delete.append(name)
-                    else:
-                        console.print(f"[yellow]警告: 快照 '{name}' 不存在[/yellow]")
-
-            elif pattern:
-                # 根据模式删除快照
-                existing_snapshots = [s.get("snapshot", "") for s in all_snapshots]
-                try:
-                    pattern_regex = re.compile(pattern.replace("*", ".*"))
-                    for snapshot in existing_snapshots:
-                        if pattern_regex.match(snapshot):
-                            snapshots_to_delete.append(snapshot)
-                except re.error as e:
-                    console.print(f"[red]错误: 无效的模式 '{pattern}': {e}[/red]")
-                    return
-
-            elif older_than:
-                # 删除早于指定日期的快照
-                try:
-                    cutoff_date = datetime.strptime(older_than, "%Y-%m-%d")
-                    for snapshot in all_snapshots:
-                        snapshot_name = snapshot.get("snapshot", "")
-                        snapshot_date = cleanup_handler.parse_snapshot_date(
-                            snapshot_name
-                        )
-                        if snapshot_date and snapshot_date.date() < cutoff_date.date():
-                            snapshots_to_delete.append(snapshot_name)
-                except ValueError as e:
+                # 删除指定的快照（去重并保持顺序，避免重复删除）
+                requested = list(dict.fromkeys(snapshot_names))
+                snapshots_to_delete = [n for n in requested if n in existing_names]
+                missing = [n for n in requested if n not in existing_names]
+                if missing:
                     console.print(
-                        f"[red]错误: 无效的日期格式 '{older_than}': {e}[/red]"
+                        f"[yellow]警告: {len(missing)} 个快照不存在: "
+                        f"{', '.join(missing)}[/yellow]"
                     )
-                    return
+
+            elif patterns:
+                # 根据模式删除快照（多个模式合并为一个正则，一次遍历）
+                snapshots_to_delete = [
+                    s for s in existing_snapshots if pattern_regex.match(s)
+                ]
+
+            elif by_date:
+                # 删除早于指定日期的快照
+                snapshots_to_delete = [
+                    s.get("snapshot", "")
+                    for s in await cleanup_handler.list_snapshots_before(cutoff_ms)
+                ]
 
             if not snapshots_to_delete:
                 console.print("[green]没有需要删除的快照[/green]")
@@ -536,7 +510,10 @@ def cleanup(
 
             # 确认删除
             if not force and not dry_run:
-                confirm = input("\n确认删除这些快照吗? (y/N): ")
+                # 在线程中等待输入，避免阻塞事件循环
+                confirm = await asyncio.to_thread(
+                    input, "\n确认删除这些快照吗? (y/N): "
+                )
                 if confirm.lower() not in ["y", "yes"]:
                     console.print("[yellow]操作已取消[/yellow]")
                     return
@@ -546,17 +523,20 @@ def cleanup(
                 return
 
             # 执行删除
-            deleted_count = 0
-            failed_count = 0
+            with Progress(console=console, transient=True) as progress:
+                task = progress.add_task("删除快照", total=len(snapshots_to_delete))
+                result = await cleanup_handler.delete_snapshots(
+                    snapshots_to_delete,
+                    on_progress=lambda n: progress.advance(task, n),
+                )
 
-            for snapshot in snapshots_to_delete:
-                try:
-                    await cleanup_handler.delete_snapshot(snapshot)
-                    deleted_count += 1
-                    console.print(f"[green]✓ 已删除: {snapshot}[/green]")
-                except Exception as e:
-                    failed_count += 1
-                    console.print(f"[red]✗ 删除失败: {snapshot} - {e}[/red]")
+            for snapshot in result["deleted"]:
+                console.print(f"[green]✓ 已删除: {snapshot}[/green]")
+            for snapshot, error in result["failed"].items():
+                console.print(f"[red]✗ 删除失败: {snapshot} - {error}[/red]")
+
+            deleted_count = len(result["deleted"])
+            failed_count = len(result["failed"])
 
             # 显示结果
             console.print("\n[bold]清理完成:[/bold]")
@@ -571,7 +551,7 @@ def cleanup(
         finally:
             await cleanup_handler.close()
 
-    asyncio.run(run_cleanup())
+    run_async(run_cleanup())
 
 
 @cli.command()
@@ -582,37 +562,34 @@ def status(config: SnapshotConfig, snapshot_name: str) -> None:
 
     async def run_status() -> None:
         try:
-            restore_handler = ElasticsearchRestore(config)
-            await restore_handler.connect()
-            await restore_handler.create_s3_repository()
+            async with ElasticsearchRestore(config) as restore_handler:
+                await restore_handler.ensure_repository(create_if_missing=False)
 
-            status_info = await restore_handler.get_snapshot_status(snapshot_name)
+                status_info = await restore_handler.get_snapshot_status(snapshot_name)
 
-            if not status_info:
-                console.print(f"[yellow]快照 '{snapshot_name}' 未找到[/yellow]")
-                return
+                if not status_info:
+                    console.print(f"[yellow]快照 '{snapshot_name}' 未找到[/yellow]")
+                    return
 
-            # Display status information
-            console.print(
-                Panel.fit(
-                    f"[bold]快照状态信息[/bold]\n"
-                    f"名称: {snapshot_name}\n"
-                    f"状态: {status_info.get('state', 'UNKNOWN')}\n"
-                    f"开始时间: {status_info.get('start_time', 'N/A')}\n"
-                    f"结束时间: {status_info.get('end_time', 'N/A')}\n"
-                    f"索引: {', '.join(status_info.get('indices', []))}",
-                    title="状态详情",
+                # Display status information
+                console.print(
+                    Panel.fit(
+                        f"[bold]快照状态信息[/bold]\n"
+                        f"名称: {snapshot_name}\n"
+                        f"状态: {status_info.get('state', 'UNKNOWN')}\n"
+                        f"开始时间: {status_info.get('start_time', 'N/A')}\n"
+                        f"结束时间: {status_info.get('end_time', 'N/A')}\n"
+                        f"索引: {', '.join(status_info.get('indices', []))}",
+                        title="状态详情",
+                    )
                 )
-            )
 
         except Exception as e:
             logger.error(f"获取状态失败: {e}")
             console.print(f"[red]获取状态失败: {e}[/red]")
             sys.exit(1)
-        finally:
-            await restore_handler.close()
 
-    asyncio.run(run_status())
+    run_async(run_status())
 
 
 def main() -> None:
@@ -0,0 +1,438 @@
+"""Shared Elasticsearch snapshot repository handling."""
+
+import asyncio
+import re
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Any
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import (
+    ApiError,
+    ConnectionTimeout,
+    NotFoundError,
+    RequestError,
+)
+
+from models.config import SnapshotConfig
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 删除请求只等待 master 接受，S3 上的数据清理在后台继续
+DELETE_REQUEST_TIMEOUT = 30
+
+# 旧版本集群不允许并发删除，返回 503 时的最长退避时间（秒）
+DELETE_MAX_BACKOFF = 30
+
+# 支持的快照命名格式:
+#   snapshot_2025_07_29t13_04_24
+#   snapshot_20250729_131212 / snapshot20250729_131212
+_SNAPSHOT_DATE_RE = re.compile(
+    r"^snapshot_?(\d{4})_?(\d{2})_?(\d{2})[t_](\d{2})_?(\d{2})_?(\d{2})$"
+)
+
+
+def _same_repository(existing: dict[str, Any], desired: dict[str, Any]) -> bool:
+    """Check whether a registered repository matches the desired body.
+
+    Elasticsearch returns setting values as strings, so both sides are
+    compared in that form.
+    """
+
+    def _normalize(settings: dict[str, Any]) -> dict[str, str]:
+        return {
+            key: str(value).lower() if isinstance(value, bool) else str(value)
+            for key, value in settings.items()
+        }
+
+    return existing.get("type") == desired["type"] and _normalize(
+        existing.get("settings", {})
+    ) == _normalize(desired["settings"])
+
+
+class EsRepoBase:
+    """Connection, repository and snapshot deletion shared by the handlers."""
+
+    def __init__(self, config: SnapshotConfig):
+        """Initialize handler with configuration."""
+        self.config = config
+        self.es_client: AsyncElasticsearch | None = None
+        # connect() 成功后为 True，供调用方判断是否需要重新建立连接
+        self._connected = False
+        self._repository_ready = False
+        # (获取时间, 是否详细, 快照列表)，避免短时间内重复遍历 S3 仓库
+        self._snapshots_cache: tuple[float, bool, list[dict[str, Any]]] | None = None
+        self._cache_ttl = 30.0
+
+    @staticmethod
+    def snapshot_start_time(snapshot: dict[str, Any]) -> datetime | None:
+        """Get a snapshot's start time in UTC, falling back to its name.
+
+        ``start_time_in_millis`` is authoritative; it is only missing from
+        non-verbose listings.
+        """
+        start_ms = snapshot.get("start_time_in_millis")
+        if start_ms is not None:
+            return datetime.fromtimestamp(start_ms / 1000, UTC)
+        return EsRepoBase.parse_snapshot_date(snapshot.get("snapshot", ""))
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def parse_snapshot_date(snapshot_name: str) -> datetime | None:
+        """Parse the date from a snapshot name, as UTC.
+
+        Generated names carry the local time they were created at. The result
+        depends only on the name, so it is memoized across calls and handler
+        instances.
+        """
+        match = _SNAPSHOT_DATE_RE.match(snapshot_name)
+        if match is None:
+            return None
+
+        try:
+            return datetime(*map(int, match.groups())).astimezone(UTC)
+        except ValueError as e:
+            logger.warning(
+                "Could not parse date from snapshot name '%s': %s", snapshot_name, e
+            )
+            return None
+
+    def _client_params(self) -> dict[str, Any]:
+        """Get the client keyword arguments for the cluster this handler uses."""
+        # 连接参数由配置统一生成，快照与轮转处理器共用
+        return self.config.es_connection_params
+
+    async def connect(self) -> None:
+        """Establish connection to Elasticsearch cluster.
+
+        An existing client is reused as long as the cluster still answers.
+        """
+        if self.es_client is not None:
+            if await self.es_client.ping():
+                return
+            await self.es_client.close()
+            self.es_client = None
+            self._connected = False
+
+        try:
+            self.es_client = AsyncElasticsearch(**self._client_params())
+
+            # Test connection
+            info = await self.es_client.info()
+            logger.info("Connected to Elasticsearch cluster: %s", info["cluster_name"])
+            self._connected = True
+
+        except Exception as e:
+            logger.error("Failed to connect to Elasticsearch: %s", e)
+            # 客户端已创建时关闭它，避免泄漏 aiohttp 会话
+            if self.es_client is not None:
+                await self.es_client.close()
+                self.es_client = None
+            raise
+
+    async def create_repository(self) -> None:
+        """Create repository for snapshots, skipping it if already registered."""
+        await self.ensure_repository(create_if_missing=True)
+
+    async def ensure_repository(self, create_if_missing: bool = True) -> None:
+        """Make sure the snapshot repository is registered.
+
+        Read-only commands pass ``create_if_missing=False`` so that only a
+        lookup is made; a missing repository is then reported as an error.
+        """
+        if not self.es_client:
+            raise RuntimeError("Not connected to Elasticsearch")
+        if self._repository_ready:
+            return
+
+        repository_body = self._repository_body()
+
+        # 存储库已存在且配置一致时跳过创建，避免 S3 存储库的校验开销
+        try:
+            response = await self.es_client.snapshot.get_repository(
+                name=self.config.repository_name
+            )
+            existing = response.get(self.config.repository_name, {})
+            if not create_if_missing or _same_repository(existing, repository_body):
+                logger.info(
+                    "Repository already exists: %s", self.config.repository_name
+                )
+                self._repository_ready = True
+                return
+            logger.info(
+                "Repository settings changed, updating: %s",
+                self.config.repository_name,
+            )
+        except NotFoundError:
+            if not create_if_missing:
+                raise RuntimeError(
+                    f"Repository '{self.config.repository_name}' does not exist"
+                ) from None
+
+        try:
+            await self.es_client.snapshot.create_repository(
+                name=self.config.repository_name,
+                body=repository_body,
+                request_timeout=self.config.timeout,
+                verify=False,
+            )
+
+            logger.info("Registered repository: %s", self.config.repository_name)
+            self._repository_ready = True
+
+        except RequestError as e:
+            if "already exists" in str(e):
+                logger.info(
+                    "Repository already exists: %s", self.config.repository_name
+                )
+                self._repository_ready = True
+            else:
+                logger.error("Failed to create repository: %s", e)
+                raise
+        except Exception as e:
+            logger.error("Unexpected error creating repository: %s", e)
+            raise
+
+    def _repository_body(self) -> dict[str, Any]:
+        """Build the repository registration body from the config."""
+        # 根据存储库名称判断类型
+        if self.config.repository_name.startswith("s3_"):
+            settings = {
+                "bucket": self.config.bucket_name,
+                "base_path": self.config.base_path,
+                "region": self.config.region,
+            }
+
+            # Add optional settings if they are provided
+            if self.config.endpoint:
+                settings["endpoint"] = self.config.endpoint
+            if self.config.protocol:
+                settings["protocol"] = self.config.protocol
+            if self.config.path_style_access is not None:
+                settings["path_style_access"] = self.config.path_style_access
+            if hasattr(self.config, "aws_region") and self.config.aws_region:
+                settings["region"] = self.config.aws_region
+
+            return {
+                "type": "s3",
+                "settings": settings,
+            }
+
+        # 默认使用文件系统存储库
+        return {
+            "type": "fs",
+            "settings": {
+                "location": f"/usr/share/elasticsearch/data/snapshots/{self.config.repository_name}",
+                "compress": True,
+            },
+        }
+
+    async def list_snapshots(self, verbose: bool = True) -> list[dict[str, Any]]:
+        """List all available snapshots in the repository.
+
+        With ``verbose=False`` only names, indices and state are returned,
+        which is much cheaper on large S3 repositories. Results are cached
+        for ``_cache_ttl`` seconds.
+        """
+        if not self.es_client:
+            raise RuntimeError("Not connected to Elasticsearch")
+
+        if self._snapshots_cache is not None:
+            fetched_at, cached_verbose, snapshots = self._snapshots_cache
+            # 详细结果也可以满足精简请求
+            if (cached_verbose or not verbose) and (
+                time.monotonic() - fetched_at < self._cache_ttl
+            ):
+                return snapshots
+
+        try:
+            response = await self.es_client.snapshot.get(
+                repository=self.config.repository_name,
+                snapshot="_all",
+                verbose=verbose,
+            )
+
+            snapshots = response.get("snapshots", [])
+            self._snapshots_cache = (time.monotonic(), verbose, snapshots)
+            return snapshots
+
+        except Exception as e:
+            logger.error("Failed to list snapshots: %s", e)
+            raise
+
+    async def get_snapshot_status(self, snapshot_name: str) -> dict[str, Any]:
+        """Get status of a snapshot."""
+        if not self.es_client:
+            raise RuntimeError("Not connected to Elasticsearch")
+
+        try:
+            response = await self.es_client.snapshot.get(
+                repository=self.config.repository_name,
+                snapshot=snapshot_name,
+            )
+
+            return response
+
+        except NotFoundError:
+            logger.warning("Snapshot '%s' not found", snapshot_name)
+            return {}
+        except Exception as e:
+            logger.error("Failed to get snapshot status: %s", e)
+            raise
+
+    async def delete_snapshot(self, snapshot_name: str) -> None:
+        """Delete a specific snapshot."""
+        if not self.es_client:
+            raise RuntimeError("Not connected to Elasticsearch")
+
+        self._snapshots_cache = None
+        try:
+            logger.debug("Deleting snapshot: %s", snapshot_name)
+            await self._retry_delete(snapshot_name)
+            logger.debug("Successfully deleted snapshot: %s", snapshot_name)
+
+        except ConnectionTimeout:
+            logger.info("Deletion of snapshot '%s' is still running", snapshot_name)
+            if self.config.wait_for_completion:
+                await self._wait_for_delete(snapshot_name)
+        except NotFoundError:
+            logger.warning("Snapshot '%s' not found", snapshot_name)
+        except Exception as e:
+            logger.error("Failed to delete snapshot '%s': %s", snapshot_name, e)
+            raise
+
+    async def delete_snapshots(
+        self,
+        snapshot_names: list[str],
+        chunk_size: int | None = None,
+        on_progress: Callable[[int], None] | None = None,
+        concurrency: int | None = None,
+    ) -> dict[str, Any]:
+        """Delete several snapshots using comma-separated bulk requests.
+
+        Names are sent in chunks of ``chunk_size`` (``delete_batch_size`` from
+        the config by default), one chunk at a time. If a chunk
+        is rejected (e.g. by clusters without multi-name delete support), its
+        snapshots are deleted individually with bounded concurrency so that a
+        single bad name does not fail the whole batch. ``concurrency``
+        defaults to ``cleanup_concurrency`` from the config. ``on_progress``
+        is called with the number of snapshots handled after each step.
+        """
+        if not self.es_client:
+            raise RuntimeError("Not connected to Elasticsearch")
+
+        chunk_size = chunk_size or self.config.delete_batch_size
+        deleted: list[str] = []
+        failed: dict[str, str] = {}
+        semaphore = asyncio.Semaphore(concurrency or self.config.cleanup_concurrency)
+        self._snapshots_cache = None
+
+        async def _delete_one(snapshot_name: str) -> tuple[str, Exception | None]:
+            async with semaphore:
+                try:
+                    await self.delete_snapshot(snapshot_name)
+                    return snapshot_name, None
+                except Exception as e:
+                    return snapshot_name, e
+                finally:
+                    if on_progress is not None:
+                        on_progress(1)
+
+        logger.info("Deleting %s snapshots", len(snapshot_names))
+
+        for start in range(0, len(snapshot_names), chunk_size):
+            chunk = snapshot_names[start : start + chunk_size]
+            try:
+                logger.debug("Deleting %s snapshots: %s", len(chunk), chunk)
+                try:
+                    await self._retry_delete(",".join(chunk))
+                except ConnectionTimeout:
+                    logger.info("Deletion of %s snapshots is still running", len(chunk))
+                    if self.config.wait_for_completion:
+                        await self._wait_for_delete(",".join(chunk))
+                deleted.extend(chunk)
+                if on_progress is not None:
+                    on_progress(len(chunk))
+            except Exception as e:
+                logger.warning("Bulk delete failed, retrying one by one: %s", e)
+                results = await asyncio.gather(*(_delete_one(n) for n in chunk))
+                for snapshot_name, error in results:
+                    if error is None:
+                        deleted.append(snapshot_name)
+                    else:
+                        failed[snapshot_name] = str(error)
+
+        logger.info(
+            "Snapshot deletion finished: %s deleted, %s failed (deleted=%s, failed=%s)",
+            len(deleted),
+            len(failed),
+            deleted,
+            list(failed),
+        )
+        return {"deleted": deleted, "failed": failed}
+
+    async def _retry_delete(self, snapshot: str, max_retries: int = 5) -> None:
+        """Send a snapshot delete request, backing off while the cluster is busy.
+
+        Clusters that cannot run deletes concurrently answer with 503
+        ``concurrent_snapshot_execution_exception``; such requests are retried
+        with exponential backoff capped at ``DELETE_MAX_BACKOFF`` seconds.
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                await self.es_client.snapshot.delete(
+                    repository=self.config.repository_name,
+                    snapshot=snapshot,
+                    request_timeout=DELETE_REQUEST_TIMEOUT,
+                )
+                return
+            except ApiError as e:
+                busy = e.meta.status == 503 or (
+                    "concurrent_snapshot_execution_exception" in str(e)
+                )
+                if not busy or attempt == max_retries:
+                    raise
+                delay = min(DELETE_MAX_BACKOFF, 2**attempt)
+                logger.info(
+                    "Cluster busy deleting snapshots, retrying '%s' in %ss",
+                    snapshot,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def _wait_for_delete(
+        self,
+        snapshot_name: str,
+        poll_interval: float = 5.0,
+        max_wait: float | None = None,
+    ) -> None:
+        """Poll the tasks API until no snapshot delete task is running."""
+        deadline = time.monotonic() + (max_wait or self.config.timeout)
+
+        while time.monotonic() < deadline:
+            response = await self.es_client.tasks.list(
+                actions="cluster:admin/snapshot/delete"
+            )
+            if not any(
+                node.get("tasks") for node in response.get("nodes", {}).values()
+            ):
+                logger.debug("Deletion of snapshot '%s' completed", snapshot_name)
+                return
+            await asyncio.sleep(poll_interval)
+
+        logger.warning(
+            "Timed out waiting for deletion of snapshot '%s' to complete",
+            snapshot_name,
+        )
+
+    async def close(self) -> None:
+        """Close Elasticsearch connection."""
+        if self.es_client:
+            await self.es_client.close()
+            self.es_client = None
+            self._connected = False
+            self._repository_ready = False
+            logger.info("Closed Elasticsearch connection")
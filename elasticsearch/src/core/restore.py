@@ -1,150 +1,109 @@
 """Elasticsearch restore functionality."""
 
+import asyncio
 from typing import Any
 
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError, RequestError
 
-from models.config import SnapshotConfig
+try:
+    from elasticsearch.serializer import OrjsonSerializer
+except ImportError:  # orjson is optional
+    OrjsonSerializer = None
+
+from core._base import EsRepoBase
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 单次 open/close 请求被拒绝时的分批大小
+INDEX_BATCH_SIZE = 50
 
-class ElasticsearchRestore:
-    """Handles Elasticsearch restore operations from S3."""
-
-    def __init__(self, config: SnapshotConfig):
-        """Initialize restore handler with configuration."""
-        self.config = config
-        self.es_client: Elasticsearch | None = None
 
-    async def connect(self) -> None:
-        """Establish connection to Elasticsearch cluster."""
-        try:
-            # Build connection parameters
-            connection_params = {
-                "hosts": self.config.restore_hosts_list,
-                "verify_certs": self.config.restore_verify_certs,
-                "request_timeout": self.config.timeout,
-            }
+class ElasticsearchRestore(EsRepoBase):
+    """Handles Elasticsearch restore operations from S3."""
 
-            # Add authentication if provided
-            if self.config.restore_username and self.config.restore_password:
-                connection_params.update(
-                    {
-                        "basic_auth": (
-                            self.config.restore_username,
-                            self.config.restore_password,
-                        )
-                    }
-                )
+    async def __aenter__(self) -> "ElasticsearchRestore":
+        await self.connect()
+        return self
 
-            self.es_client = Elasticsearch(**connection_params)
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
 
-            # Test connection
-            info = self.es_client.info()
-            logger.info(f"Connected to Elasticsearch cluster: {info['cluster_name']}")
+    def _client_params(self) -> dict[str, Any]:
+        """Get the client keyword arguments for the restore cluster."""
+        # 复制一份，避免修改配置中缓存的参数
+        params = dict(self.config.restore_connection_params)
 
-        except Exception as e:
-            logger.error(f"Failed to connect to Elasticsearch: {e}")
-            raise
-
-    async def create_repository(self) -> None:
-        """Create repository for snapshots."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            # 根据存储库名称判断类型
-            if self.config.repository_name.startswith("s3_"):
-                settings = {
-                    "bucket": self.config.bucket_name,
-                    "base_path": self.config.base_path,
-                    "region": self.config.region,
-                }
-
-                # Add optional settings if they are provided
-                if self.config.endpoint:
-                    settings["endpoint"] = self.config.endpoint
-
-                if self.config.protocol:
-                    settings["protocol"] = self.config.protocol
-                if self.config.path_style_access is not None:
-                    settings["path_style_access"] = self.config.path_style_access
-                if hasattr(self.config, "aws_region") and self.config.aws_region:
-                    settings["region"] = self.config.aws_region
-
-                repository_body = {
-                    "type": "s3",
-                    "settings": settings,
-                }
-            else:
-                # 默认使用文件系统存储库
-                repository_body = {
-                    "type": "fs",
-                    "settings": {
-                        "location": f"/usr/share/elasticsearch/data/snapshots/{self.config.repository_name}",
-                        "compress": True,
-                    },
-                }
-
-            self.es_client.snapshot.create_repository(
-                name=self.config.repository_name,
-                body=repository_body,
-                request_timeout=self.config.timeout,
-                verify=False,
-            )
-
-            logger.info(f"Created repository: {self.config.repository_name}")
-
-        except RequestError as e:
-            if "already exists" in str(e):
-                logger.info(f"Repository already exists: {self.config.repository_name}")
-            else:
-                logger.error(f"Failed to create repository: {e}")
-                raise
-        except Exception as e:
-            logger.error(f"Unexpected error creating repository: {e}")
-            raise
+        # 安装了 orjson 时用它解析较大的快照列表响应
+        if OrjsonSerializer is not None:
+            params["serializer"] = OrjsonSerializer()
+        return params
 
     async def close_indices(self, indices: list[str]) -> None:
         """Close indices before restore operation."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        for index in indices:
-            try:
-                logger.info(f"Closing index: {index}")
-                self.es_client.indices.close(
-                    index=index,
-                    ignore_unavailable=True,
-                    request_timeout=self.config.timeout,
-                )
-            except NotFoundError:
-                logger.warning(f"Index '{index}' not found - skipping close operation")
-            except Exception as e:
-                logger.error(f"Failed to close index '{index}': {e}")
-                raise
+        await self._set_indices_state(indices, "close")
 
     async def open_indices(self, indices: list[str]) -> None:
         """Open indices after restore operation."""
+        await self._set_indices_state(indices, "open")
+
+    async def _set_indices_state(self, indices: list[str], action: str) -> None:
+        """Open or close indices with one request, chunking if it is rejected."""
         if not self.es_client:
             raise RuntimeError("Not connected to Elasticsearch")
+        if not indices:
+            return
+
+        method = getattr(self.es_client.indices, action)
 
-        for index in indices:
+        async def _apply(batch: list[str]) -> None:
             try:
-                logger.info(f"Opening index: {index}")
-                self.es_client.indices.open(
-                    index=index,
+                await method(
+                    index=",".join(batch),
                     ignore_unavailable=True,
                     request_timeout=self.config.timeout,
                 )
             except NotFoundError:
-                logger.warning(f"Index '{index}' not found - skipping open operation")
-            except Exception as e:
-                logger.error(f"Failed to open index '{index}': {e}")
-                raise
+                logger.warning(
+                    "Indices %s not found - skipping %s operation", batch, action
+                )
+
+        logger.info("Running %s on %s indices: %s", action, len(indices), indices)
+        try:
+            await _apply(indices)
+            return
+        except RequestError as e:
+            # 索引列表过长时请求会被拒绝，退回到分批处理
+            logger.warning(
+                "Single %s request rejected (%s), retrying in batches of %s",
+                action,
+                e,
+                INDEX_BATCH_SIZE,
+            )
+        except Exception as e:
+            logger.error("Failed to %s indices: %s", action, e)
+            raise
+
+        semaphore = asyncio.Semaphore(self.config.index_concurrency)
+
+        async def _apply_batch(batch: list[str]) -> None:
+            async with semaphore:
+                try:
+                    await _apply(batch)
+                except Exception as e:
+                    logger.error("Failed to %s indices %s: %s", action, batch, e)
+                    raise
+
+        results = await asyncio.gather(
+            *(
+                _apply_batch(indices[i : i + INDEX_BATCH_SIZE])
+                for i in range(0, len(indices), INDEX_BATCH_SIZE)
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
 
     async def restore_snapshot(self, snapshot_name: str) -> None:
         """Restore snapshot to destination cluster."""
@@ -156,21 +115,23 @@ class ElasticsearchRestore:
 
         try:
             restore_body = {
-                "indices": ",".join(self.config.indices_list),
+                "indices": self.config.indices_normalized,
                 "ignore_unavailable": True,
                 "include_global_state": False,
                 "include_aliases": True,
             }
 
             logger.info(
-                f"Restoring snapshot '{snapshot_name}' for indices: {self.config.indices_list}"
+                "Restoring snapshot '%s' for indices: %s",
+                snapshot_name,
+                self.config.indices_list,
             )
 
             # Close indices before restore
             await self.close_indices(self.config.indices_list)
 
             # Perform restore
-            self.es_client.snapshot.restore(
+            await self.es_client.snapshot.restore(
                 repository=self.config.repository_name,
                 snapshot=snapshot_name,
                 body=restore_body,
@@ -180,75 +141,29 @@ class ElasticsearchRestore:
 
             if self.config.wait_for_completion:
                 logger.info(
-                    f"Restore from snapshot '{snapshot_name}' completed successfully"
+                    "Restore from snapshot '%s' completed successfully", snapshot_name
                 )
             else:
                 logger.info(
-                    f"Restore from snapshot '{snapshot_name}' started successfully"
+                    "Restore from snapshot '%s' started successfully", snapshot_name
                 )
 
             # Open indices after restore
             await self.open_indices(self.config.indices_list)
 
         except Exception as e:
-            logger.error(f"Failed to restore snapshot: {e}")
+            logger.error("Failed to restore snapshot: %s", e)
             # Try to reopen indices even if restore failed
             try:
                 await self.open_indices(self.config.indices_list)
             except Exception as reopen_error:
                 logger.error(
-                    f"Failed to reopen indices after restore failure: {reopen_error}"
+                    "Failed to reopen indices after restore failure: %s", reopen_error
                 )
             raise
 
-    async def get_snapshot_status(self, snapshot_name: str) -> dict[str, Any]:
-        """Get status of a snapshot."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            response = self.es_client.snapshot.get(
-                repository=self.config.repository_name,
-                snapshot=snapshot_name,
-            )
-
-            return response
-
-        except NotFoundError:
-            logger.warning(f"Snapshot '{snapshot_name}' not found")
-            return {}
-        except Exception as e:
-            logger.error(f"Failed to get snapshot status: {e}")
-            raise
-
-    async def list_snapshots(self) -> list[dict[str, Any]]:
-        """List all available snapshots in the repository."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            response = self.es_client.snapshot.get(
-                repository=self.config.repository_name, snapshot="_all"
-            )
-
-            return response.get("snapshots", [])
-
-        except Exception as e:
-            logger.error(f"Failed to list snapshots: {e}")
-            raise
-
-    async def close(self) -> None:
-        """Close Elasticsearch connection."""
-        if self.es_client:
-            self.es_client.close()
-            logger.info("Closed Elasticsearch connection")
-
     async def restore(self, snapshot_name: str) -> None:
         """Perform complete restore operation."""
-        try:
-            await self.connect()
+        async with self:
             await self.create_repository()
             await self.restore_snapshot(snapshot_name)
-
-        finally:
-            await self.close()
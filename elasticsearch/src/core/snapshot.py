@@ -1,115 +1,17 @@
 """Elasticsearch snapshot functionality."""
 
-from datetime import datetime
-from typing import Any
+from datetime import UTC, datetime, timedelta
+from operator import itemgetter
 
-from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import NotFoundError, RequestError
-
-from models.config import SnapshotConfig
+from core._base import EsRepoBase
 from utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-class ElasticsearchSnapshot:
+class ElasticsearchSnapshot(EsRepoBase):
     """Handles Elasticsearch snapshot operations to S3."""
 
-    def __init__(self, config: SnapshotConfig):
-        """Initialize snapshot handler with configuration."""
-        self.config = config
-        self.es_client: Elasticsearch | None = None
-
-    async def connect(self) -> None:
-        """Establish connection to Elasticsearch cluster."""
-        try:
-            # Build connection parameters
-            connection_params = {
-                "hosts": self.config.snapshot_hosts_list,
-                "verify_certs": self.config.snapshot_verify_certs,
-                "request_timeout": self.config.timeout,
-            }
-
-            # Add authentication if provided
-            if self.config.snapshot_username and self.config.snapshot_password:
-                connection_params.update(
-                    {
-                        "basic_auth": (
-                            self.config.snapshot_username,
-                            self.config.snapshot_password,
-                        )
-                    }
-                )
-
-            self.es_client = Elasticsearch(**connection_params)
-
-            # Test connection
-            info = self.es_client.info()
-            logger.info(f"Connected to Elasticsearch cluster: {info['cluster_name']}")
-
-        except Exception as e:
-            logger.error(f"Failed to connect to Elasticsearch: {e}")
-            raise
-
-    async def create_repository(self) -> None:
-        """Create repository for snapshots."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            # 根据存储库名称判断类型
-            if self.config.repository_name.startswith("s3_"):
-                settings = {
-                    "bucket": self.config.bucket_name,
-                    "base_path": self.config.base_path,
-                    "region": self.config.region,
-                }
-
-                # Add optional settings if they are provided
-                if self.config.endpoint:
-                    settings["endpoint"] = self.config.endpoint
-                if self.config.protocol:
-                    settings["protocol"] = self.config.protocol
-                if self.config.path_style_access is not None:
-                    settings["path_style_access"] = self.config.path_style_access
-                if hasattr(self.config, "aws_region") and self.config.aws_region:
-                    settings["region"] = self.config.aws_region
-
-                repository_body = {
-                    "type": "s3",
-                    "settings": settings,
-                }
-
-                logger.info(f"Creating S3 repository with settings: {settings}")
-            else:
-                # 默认使用文件系统存储库
-                repository_body = {
-                    "type": "fs",
-                    "settings": {
-                        "location": f"/usr/share/elasticsearch/data/snapshots/{self.config.repository_name}",
-                        "compress": True,
-                    },
-                }
-
-            self.es_client.snapshot.create_repository(
-                name=self.config.repository_name,
-                body=repository_body,
-                request_timeout=self.config.timeout,
-                verify=False,
-            )
-
-            logger.info(f"Created repository: {self.config.repository_name}")
-
-        except RequestError as e:
-            if "already exists" in str(e):
-                logger.info(f"Repository already exists: {self.config.repository_name}")
-            else:
-                logger.error(f"Failed to create repository: {e}")
-                raise
-        except Exception as e:
-            logger.error(f"Unexpected error creating repository: {e}")
-            raise
-
     async def create_snapshot(self) -> str:
         """Create snapshot of specified indices."""
         if not self.es_client:
@@ -125,27 +27,30 @@ class ElasticsearchSnapshot:
         try:
             # 简化快照配置，避免复杂参数
             snapshot_body = {
-                "indices": ",".join(self.config.indices_list),
+                "indices": self.config.indices_normalized,
                 "ignore_unavailable": True,
                 "include_global_state": False,
                 "partial": False,
             }
 
             logger.info(
-                f"Creating snapshot '{snapshot_name}' for indices: {self.config.indices_list}"
+                "Creating snapshot '%s' for indices: %s",
+                snapshot_name,
+                self.config.indices_list,
             )
 
-            # 先检查存储库状态
-            try:
-                repo_status = self.es_client.snapshot.get_repository(
-                    name=self.config.repository_name
-                )
-                logger.info(f"Repository status: {repo_status}")
-            except Exception as e:
-                logger.warning(f"Could not get repository status: {e}")
+            # 先检查存储库状态（create_repository 已确认过时跳过）
+            if not self._repository_ready:
+                try:
+                    repo_status = await self.es_client.snapshot.get_repository(
+                        name=self.config.repository_name
+                    )
+                    logger.info("Repository status: %s", repo_status)
+                except Exception as e:
+                    logger.warning("Could not get repository status: %s", e)
 
             # 创建快照，不等待完成
-            response = self.es_client.snapshot.create(
+            response = await self.es_client.snapshot.create(
                 repository=self.config.repository_name,
                 snapshot=snapshot_name,
                 body=snapshot_body,
@@ -153,8 +58,8 @@ class ElasticsearchSnapshot:
                 request_timeout=self.config.timeout,
             )
 
-            logger.info(f"Snapshot '{snapshot_name}' started successfully")
-            logger.info(f"Snapshot response: {response}")
+            logger.info("Snapshot '%s' started successfully", snapshot_name)
+            logger.info("Snapshot response: %s", response)
 
             # 如果需要等待完成，则单独处理
             if self.config.wait_for_completion:
@@ -165,162 +70,96 @@ class ElasticsearchSnapshot:
             return snapshot_name
 
         except Exception as e:
-            logger.error(f"Failed to create snapshot: {e}")
+            logger.error("Failed to create snapshot: %s", e)
             # 添加更详细的错误信息
             if hasattr(e, "info"):
-                logger.error(f"Error details: {e.info}")
+                logger.error("Error details: %s", e.info)
             raise
 
-    async def get_snapshot_status(self, snapshot_name: str) -> dict[str, Any]:
-        """Get status of a snapshot."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            response = self.es_client.snapshot.get(
-                repository=self.config.repository_name,
-                snapshot=snapshot_name,
-            )
-
-            return response
-
-        except NotFoundError:
-            logger.warning(f"Snapshot '{snapshot_name}' not found")
-            return {}
-        except Exception as e:
-            logger.error(f"Failed to get snapshot status: {e}")
-            raise
-
-    async def close(self) -> None:
-        """Close Elasticsearch connection."""
-        if self.es_client:
-            self.es_client.close()
-            logger.info("Closed Elasticsearch connection")
-
-    async def list_snapshots(self) -> list:
-        """List all snapshots in the repository."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            response = self.es_client.snapshot.get(
-                repository=self.config.repository_name, snapshot="_all"
-            )
-            return response.get("snapshots", [])
-        except Exception as e:
-            logger.error(f"Failed to list snapshots: {e}")
-            raise
-
-    async def delete_snapshot(self, snapshot_name: str) -> None:
-        """Delete a specific snapshot."""
-        if not self.es_client:
-            raise RuntimeError("Not connected to Elasticsearch")
-
-        try:
-            self.es_client.snapshot.delete(
-                repository=self.config.repository_name, snapshot=snapshot_name
-            )
-            logger.info(f"Deleted snapshot: {snapshot_name}")
-        except Exception as e:
-            logger.error(f"Failed to delete snapshot {snapshot_name}: {e}")
-            raise
-
-    async def cleanup_old_snapshots(self) -> None:
-        """Clean up old snapshots based on retention settings."""
-        if not self.config.retention_days and not self.config.retention_count:
+    async def cleanup_old_snapshots(
+        self,
+        retention_days: int | None = None,
+        retention_count: int | None = None,
+    ) -> None:
+        """Clean up old snapshots based on the given retention limits.
+
+        Snapshots older than ``retention_days`` or beyond the newest
+        ``retention_count`` are deleted. An existing connection (e.g. from a
+        preceding ``snapshot()``) is reused and left open for the caller to
+        close.
+        """
+        if not retention_days and not retention_count:
             logger.info("No retention settings configured, skipping cleanup")
             return
 
+        owns_connection = self.es_client is None
         try:
-            await self.connect()
-            await self.create_repository()
+            if owns_connection:
+                await self.connect()
+                await self.create_repository()
 
+            # 精简列表不含开始时间，按时间保留需要详细列表
             snapshots = await self.list_snapshots()
             if not snapshots:
                 logger.info("No snapshots found, skipping cleanup")
                 return
 
             # Sort snapshots by start time (newest first)
-            snapshots.sort(key=lambda x: x.get("start_time") or "", reverse=True)
+            dated = [(self.snapshot_start_time(s), s) for s in snapshots]
+            dated = [entry for entry in dated if entry[0] is not None]
+            dated.sort(key=itemgetter(0), reverse=True)
 
             snapshots_to_delete = []
 
             # Apply retention by count
-            if (
-                self.config.retention_count
-                and len(snapshots) > self.config.retention_count
-            ):
+            if retention_count and len(dated) > retention_count:
                 # Keep the newest snapshots, mark older ones for deletion
                 snapshots_to_delete.extend(
-                    list(snapshots[self.config.retention_count :])
-                )
-
-            # Apply retention by days
-            if self.config.retention_days:
-                from datetime import datetime, timedelta
-
-                cutoff_date = datetime.now() - timedelta(
-                    days=self.config.retention_days
+                    snapshot for _, snapshot in dated[retention_count:]
                 )
 
-                for snapshot in snapshots:
-                    start_time_str = snapshot.get("start_time")
-                    if not start_time_str:
-                        continue
-
-                    # Parse the start time (format: "2023-12-01T10:30:00.123Z")
-                    try:
-                        start_time = datetime.strptime(
-                            start_time_str.split(".")[0], "%Y-%m-%dT%H:%M:%S"
-                        )
-
-                        if start_time < cutoff_date:
-                            # Only delete if not already marked for deletion
-                            if snapshot not in snapshots_to_delete:
-                                snapshots_to_delete.append(snapshot)
-                    except ValueError:
-                        logger.warning(
-                            f"Could not parse start time for snapshot {snapshot.get('snapshot')}"
-                        )
+            marked = {snapshot.get("snapshot") for snapshot in snapshots_to_delete}
 
-            # Remove duplicates while preserving order
-            unique_snapshots_to_delete = []
-            seen = set()
-            for snapshot in snapshots_to_delete:
-                snapshot_name = snapshot.get("snapshot")
-                if snapshot_name not in seen:
-                    seen.add(snapshot_name)
-                    unique_snapshots_to_delete.append(snapshot)
-
-            # Delete the snapshots
-            for snapshot in unique_snapshots_to_delete:
-                snapshot_name = snapshot.get("snapshot")
-                try:
-                    await self.delete_snapshot(snapshot_name)
-                except Exception as e:
-                    logger.error(f"Failed to delete snapshot {snapshot_name}: {e}")
-                    # Continue with other deletions
-
-            if unique_snapshots_to_delete:
-                logger.info(
-                    f"Cleaned up {len(unique_snapshots_to_delete)} old snapshots"
+            # Apply retention by days
+            if retention_days:
+                cutoff_date = datetime.now(UTC) - timedelta(days=retention_days)
+
+                for start_time, snapshot in dated:
+                    snapshot_name = snapshot.get("snapshot")
+                    # Only delete if not already marked for deletion
+                    if start_time < cutoff_date and snapshot_name not in marked:
+                        marked.add(snapshot_name)
+                        snapshots_to_delete.append(snapshot)
+
+            # Delete the snapshots; failures are logged by delete_snapshot
+            if snapshots_to_delete:
+                await self.delete_snapshots(
+                    [snapshot.get("snapshot") for snapshot in snapshots_to_delete]
                 )
+                logger.info("Cleaned up %s old snapshots", len(snapshots_to_delete))
             else:
                 logger.info("No old snapshots to clean up")
 
         except Exception as e:
-            logger.error(f"Failed to cleanup old snapshots: {e}")
+            logger.error("Failed to cleanup old snapshots: %s", e)
             raise
         finally:
-            await self.close()
+            if owns_connection:
+                await self.close()
 
     async def snapshot(self) -> str:
-        """Perform complete snapshot operation."""
+        """Perform complete snapshot operation.
+
+        The connection is only closed if this call opened it.
+        """
+        owns_connection = self.es_client is None
         try:
-            await self.connect()
-            await self.create_repository()
+            if owns_connection:
+                await self.connect()
+                await self.create_repository()
             snapshot_name = await self.create_snapshot()
             return snapshot_name
 
         finally:
-            await self.close()
+            if owns_connection:
+                await self.close()
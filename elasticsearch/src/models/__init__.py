@@ -1,7 +1,15 @@
 """Configuration and data models for the backup toolkit."""
 
-from .config import SnapshotConfig
+from .config import (
+    REQUIRED_SNAPSHOT_ENV_VARS,
+    SnapshotConfig,
+    get_snapshot_config,
+    missing_env_vars,
+)
 
 __all__ = [
+    "REQUIRED_SNAPSHOT_ENV_VARS",
     "SnapshotConfig",
+    "get_snapshot_config",
+    "missing_env_vars",
 ]
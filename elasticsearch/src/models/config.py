@@ -1,13 +1,38 @@
 """Configuration models for Elasticsearch snapshot and restore operations."""
 
-
-from pydantic import Field, validator
-from pydantic_settings import BaseSettings
+import os
+from functools import cached_property, lru_cache
+from typing import Any
+
+from pydantic import Field, ValidationInfo, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Environment variables the snapshot job cannot run without
+REQUIRED_SNAPSHOT_ENV_VARS = frozenset(
+    {
+        "SNAPSHOT_HOSTS",
+        "ES_REPOSITORY_NAME",
+        "ES_INDICES",
+        "S3_BUCKET_NAME",
+        "S3_REGION",
+        "AWS_ACCESS_KEY_ID",
+        "AWS_SECRET_ACCESS_KEY",
+    }
+)
 
 
 class SnapshotConfig(BaseSettings):
     """Main configuration for snapshot and restore operations."""
 
+    # 配置加载后不再修改；未知的环境变量和文件字段直接忽略
+    model_config = SettingsConfigDict(
+        env_prefix="",
+        case_sensitive=False,
+        frozen=True,
+        extra="ignore",
+        populate_by_name=True,
+    )
+
     # Elasticsearch configuration
     snapshot_hosts: str = Field(
         ..., description="Snapshot Elasticsearch hosts", alias="SNAPSHOT_HOSTS"
@@ -111,42 +136,112 @@ class SnapshotConfig(BaseSettings):
         description="Enable automatic snapshot rotation",
         alias="ENABLE_ROTATION",
     )
+    index_concurrency: int = Field(
+        default=12,
+        description="Maximum number of concurrent index open/close requests",
+        alias="INDEX_CONCURRENCY",
+    )
+    cleanup_concurrency: int = Field(
+        default=8,
+        description="Maximum number of concurrent snapshot delete requests",
+        alias="CLEANUP_CONCURRENCY",
+    )
+    delete_batch_size: int = Field(
+        default=50,
+        description="Number of snapshots removed per delete request",
+        alias="DELETE_BATCH_SIZE",
+    )
 
-    @property
+    # 配置是冻结的，解析结果只计算一次
+    @cached_property
     def snapshot_hosts_list(self) -> list[str]:
         """Get snapshot hosts as a list."""
-        if "," not in self.snapshot_hosts:
-            return [self.snapshot_hosts.strip()]
-        return [host.strip() for host in self.snapshot_hosts.split(",")]
+        return [host.strip() for host in self.snapshot_hosts.split(",") if host.strip()]
 
-    @property
+    @cached_property
     def restore_hosts_list(self) -> list[str]:
         """Get restore hosts as a list."""
-        if "," not in self.restore_hosts:
-            return [self.restore_hosts.strip()]
-        return [host.strip() for host in self.restore_hosts.split(",")]
+        return [host.strip() for host in self.restore_hosts.split(",") if host.strip()]
 
-    @property
+    @cached_property
     def indices_list(self) -> list[str]:
         """Get indices as a list."""
-        if "," not in self.indices:
-            return [self.indices.strip()]
-        return [index.strip() for index in self.indices.split(",")]
-
-    @validator("snapshot_hosts", "restore_hosts")
-    def validate_hosts(cls, v):
-        """Validate that at least one host is provided."""
+        return [index.strip() for index in self.indices.split(",") if index.strip()]
+
+    @cached_property
+    def indices_normalized(self) -> str:
+        """Get indices as a comma-separated string without whitespace."""
+        return ",".join(self.indices_list)
+
+    @cached_property
+    def es_connection_params(self) -> dict[str, Any]:
+        """Get client keyword arguments for the snapshot cluster."""
+        params: dict[str, Any] = {
+            "hosts": self.snapshot_hosts_list,
+            "verify_certs": self.snapshot_verify_certs,
+            "request_timeout": self.timeout,
+            # 快照列表响应体积较大，开启 gzip 压缩
+            "http_compress": True,
+            # 只重试连接错误：create/delete 不是幂等请求，超时或 502/504 时可能
+            # 已在集群上执行；503 繁忙由 _retry_delete 退避重试
+            "max_retries": 3,
+            "retry_on_status": (),
+            # 连接池与并发的删除请求数保持一致
+            "connections_per_node": self.cleanup_concurrency,
+        }
+        if self.snapshot_username and self.snapshot_password:
+            params["basic_auth"] = (self.snapshot_username, self.snapshot_password)
+        return params
+
+    @cached_property
+    def restore_connection_params(self) -> dict[str, Any]:
+        """Get client keyword arguments for the restore cluster."""
+        params: dict[str, Any] = {
+            "hosts": self.restore_hosts_list,
+            "verify_certs": self.restore_verify_certs,
+            "request_timeout": self.timeout,
+            "http_compress": True,
+            # 同上，只重试连接错误：restore 与索引 open/close 超时或 502/504
+            # 时可能已在集群上执行
+            "max_retries": 3,
+            "retry_on_status": (),
+            # 连接池与并发的索引请求数保持一致
+            "connections_per_node": self.index_concurrency,
+        }
+        if self.restore_username and self.restore_password:
+            params["basic_auth"] = (self.restore_username, self.restore_password)
+        return params
+
+    @field_validator(
+        "snapshot_hosts",
+        "restore_hosts",
+        "indices",
+        "repository_name",
+        "bucket_name",
+        "access_key",
+        "secret_key",
+    )
+    @classmethod
+    def validate_non_empty(cls, v, info: ValidationInfo):
+        """Validate that a required value is not blank."""
         if not v or not v.strip():
-            raise ValueError("At least one host must be provided")
+            raise ValueError(f"{info.field_name} must be specified")
         return v
 
-    @validator("indices")
-    def validate_indices(cls, v):
-        """Validate that at least one index is specified."""
-        if not v or not v.strip():
-            raise ValueError("At least one index must be specified")
-        return v
 
-    class Config:
-        env_prefix = ""
-        case_sensitive = False
+@lru_cache(maxsize=1)
+def get_snapshot_config() -> SnapshotConfig:
+    """Get the process-wide SnapshotConfig loaded from environment variables.
+
+    The configuration is parsed and validated once; later calls return the
+    same instance.
+    """
+    return SnapshotConfig()
+
+
+def missing_env_vars(
+    required: frozenset[str] = REQUIRED_SNAPSHOT_ENV_VARS,
+) -> list[str]:
+    """Get the required environment variables that are unset or empty, sorted."""
+    present = {name for name, value in os.environ.items() if value}
+    return sorted(required - present)
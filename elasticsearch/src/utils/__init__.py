@@ -2,10 +2,12 @@
 
 from .config_loader import load_config_from_env, load_config_from_file
 from .logging import get_logger, setup_logging
+from .runner import run_async
 
 __all__ = [
     "get_logger",
     "setup_logging",
     "load_config_from_file",
     "load_config_from_env",
+    "run_async",
 ]
@@ -1,13 +1,24 @@
 """Configuration loading utilities."""
 
 import json
+from functools import cache
 from pathlib import Path
 from typing import Any
 
 import yaml
 from dotenv import load_dotenv
 
-from models.config import SnapshotConfig
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # orjson is optional
+    _json_loads = json.loads
+
+from models.config import SnapshotConfig, get_snapshot_config
 
 
 def load_config_from_file(config_path: str | Path) -> SnapshotConfig:
@@ -23,11 +34,20 @@ def load_config_from_file(config_path: str | Path) -> SnapshotConfig:
         FileNotFoundError: If config file doesn't exist
         ValueError: If config file format is not supported
     """
-    config_path = Path(config_path)
+    config_path = Path(config_path).resolve()
 
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
 
+    # 以修改时间作为缓存键的一部分，文件变化后会重新加载
+    return _load_config_from_path(str(config_path), config_path.stat().st_mtime_ns)
+
+
+@cache
+def _load_config_from_path(resolved_path: str, mtime_ns: int) -> SnapshotConfig:
+    """Load and cache the configuration for a file version."""
+    config_path = Path(resolved_path)
+
     suffix = config_path.suffix.lower()
     name = config_path.name.lower()
 
@@ -42,6 +62,9 @@ def load_config_from_file(config_path: str | Path) -> SnapshotConfig:
 def load_config_from_env() -> SnapshotConfig:
     """Load configuration from environment variables.
 
+    The configuration is shared with ``get_snapshot_config()`` and built once
+    per process; use ``get_snapshot_config.cache_clear()`` to force a reload.
+
     Returns:
         SnapshotConfig instance
 
@@ -58,7 +81,7 @@ def load_config_from_env() -> SnapshotConfig:
             pass
 
     try:
-        return SnapshotConfig()
+        return get_snapshot_config()
     except Exception as e:
         raise ValueError(f"Failed to load configuration from environment: {e}") from e
 
@@ -71,11 +94,13 @@ def _load_from_env_file(env_path: Path) -> SnapshotConfig:
 
 def _load_from_structured_file(config_path: Path) -> SnapshotConfig:
     """Load configuration from JSON or YAML file."""
-    with open(config_path, encoding="utf-8") as f:
-        if config_path.suffix.lower() == ".json":
-            config_data = json.load(f)
-        else:  # YAML
-            config_data = yaml.safe_load(f)
+    # 两种解析器都直接接受 bytes，省去一次文本解码
+    data = config_path.read_bytes()
+
+    if config_path.suffix.lower() == ".json":
+        config_data = _json_loads(data)
+    else:  # YAML
+        config_data = yaml.load(data, Loader=_YamlLoader)
 
     # Convert to SnapshotConfig
     return SnapshotConfig(**config_data)
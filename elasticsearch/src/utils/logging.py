@@ -1,25 +1,179 @@
 """Logging utilities for the backup toolkit."""
 
+import atexit
 import logging
+import os
+import queue
 import sys
+from functools import cache
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
+from typing import TYPE_CHECKING
 
-from rich.console import Console
-from rich.logging import RichHandler
+# rich 只在美化输出时才导入，普通输出（如 K8s 任务）不加载
+if TYPE_CHECKING:
+    from rich.console import Console
+
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# setup_logging 可能被多次调用，控制台处理器按配置只创建一次
+_console_handlers: dict[tuple[bool, str | None], logging.Handler] = {}
+_console: "Console | None" = None
+
+
+def _get_console() -> "Console":
+    """Get the rich console used for log output, creating it on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        # 关闭自动高亮，避免逐条日志做正则匹配
+        _console = Console(highlight=False)
+    return _console
+
+
+def _get_console_handler(use_rich: bool, format_string: str | None) -> logging.Handler:
+    """Get the console handler for the given style, creating it on first use."""
+    key = (use_rich, None if use_rich else format_string)
+    handler = _console_handlers.get(key)
+
+    if handler is None:
+        if use_rich:
+            from rich.logging import RichHandler
+
+            # Use rich handler for better console output; rich tracebacks
+            # are only rendered when a record carries exception info
+            handler = RichHandler(
+                console=_get_console(),
+                show_time=True,
+                show_path=False,
+                markup=False,
+                rich_tracebacks=True,
+            )
+        else:
+            # Use standard logging format
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter(format_string or DEFAULT_FORMAT))
+        _console_handlers[key] = handler
+    elif isinstance(handler, logging.StreamHandler):
+        # sys.stdout 可能已被替换（例如测试中捕获输出）
+        handler.setStream(sys.stdout)
+
+    return handler
+
+
+class _LocalQueueHandler(QueueHandler):
+    """Queue handler for a listener in the same process.
+
+    Records are enqueued unchanged, so message formatting and rich
+    tracebacks are handled by the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# 日志的格式化与写入在后台线程完成，调用方只需入队
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queue_handler = _LocalQueueHandler(_log_queue)
+_listener: QueueListener | None = None
+
+
+def _attach_to_listener(handler: logging.Handler) -> None:
+    """Route queued records to the handler, starting the listener once."""
+    global _listener
+
+    if _listener is None:
+        _listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        # 退出前处理完队列中剩余的日志
+        atexit.register(_stop_listener)
+    else:
+        # 先写完按旧配置入队的日志，再切换处理器
+        _stop_listener()
+        _listener.handlers = (handler,)
+        _listener.start()
+
+
+def _stop_listener() -> None:
+    """Drain the log queue and flush any buffered records."""
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.flush()
+
+
+def _env_flag(name: str) -> bool | None:
+    """Read a boolean environment variable, or None if it is unset."""
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return None
+    return value in ("1", "true", "yes", "on")
+
+
+def _buffered(handler: logging.Handler) -> logging.Handler:
+    """Wrap the handler so records are written in batches.
+
+    Buffering is opt-in: ``LOG_BUFFER_CAPACITY`` sets the batch size and is
+    off when unset. Warnings and errors flush the buffer immediately.
+    """
+    try:
+        capacity = int(os.getenv("LOG_BUFFER_CAPACITY") or 0)
+    except ValueError:
+        capacity = 0
+    if capacity <= 1:
+        return handler
+
+    buffered = MemoryHandler(
+        capacity, flushLevel=logging.WARNING, target=handler, flushOnClose=True
+    )
+    # MemoryHandler 刷新时不再检查级别，需在入口处过滤
+    buffered.setLevel(handler.level)
+    return buffered
+
+
+_third_party_configured = False
+
+
+def _configure_third_party_levels() -> None:
+    """Quiet noisy library loggers; only done on the first setup."""
+    global _third_party_configured
+    if _third_party_configured:
+        return
+
+    for name in ("elasticsearch", "urllib3", "boto3", "botocore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    _third_party_configured = True
+
+
+def _pretty_output_enabled() -> bool:
+    """Decide whether console logs use rich formatting by default.
+
+    ``LOG_STDOUT_PRETTY`` forces it on or off; otherwise rich output is only
+    used when stdout is a terminal.
+    """
+    pretty = _env_flag("LOG_STDOUT_PRETTY")
+    return sys.stdout.isatty() if pretty is None else pretty
 
 
 def setup_logging(
-    level: str = "INFO", format_string: str | None = None, use_rich: bool = True
+    level: str = "INFO",
+    format_string: str | None = None,
+    use_rich: bool | None = None,
 ) -> None:
     """Setup logging configuration.
 
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         format_string: Custom format string for logging
-        use_rich: Whether to use rich formatting for better console output
+        use_rich: Whether to use rich formatting for better console output;
+            defaults to ``LOG_STDOUT_PRETTY`` or whether stdout is a terminal
     """
     # Convert string level to logging constant
     log_level = getattr(logging, level.upper(), logging.INFO)
 
+    # 非交互环境（如 K8s 任务）默认使用普通格式，rich 的逐条渲染开销较大
+    if use_rich is None:
+        use_rich = _pretty_output_enabled()
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
@@ -27,41 +181,29 @@ def setup_logging(
     # Clear existing handlers
     root_logger.handlers.clear()
 
-    if use_rich:
-        # Use rich handler for better console output
-        console = Console()
-        rich_handler = RichHandler(
-            console=console,
-            show_time=True,
-            show_path=False,
-            markup=False,
-            rich_tracebacks=True,
-        )
-        rich_handler.setLevel(log_level)
-        root_logger.addHandler(rich_handler)
-    else:
-        # Use standard logging format
-        if format_string is None:
-            format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    handler = _get_console_handler(use_rich, format_string)
+    handler.setLevel(log_level)
+    if not use_rich:
+        # 设置了 LOG_BUFFER_CAPACITY 时按批写入，减少逐条 write/flush 的系统调用
+        handler = _buffered(handler)
+    _attach_to_listener(handler)
+    root_logger.addHandler(_queue_handler)
 
-        formatter = logging.Formatter(format_string)
+    # 格式中不使用线程/进程信息时，跳过 makeRecord 中收集它们的开销
+    fields = "" if use_rich else (format_string or DEFAULT_FORMAT)
+    logging.logThreads = "%(thread" in fields
+    logging.logProcesses = "%(process" in fields
+    logging.logMultiprocessing = "%(processName)" in fields
 
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(log_level)
-        console_handler.setFormatter(formatter)
-        root_logger.addHandler(console_handler)
-
-    # Set specific logger levels
-    logging.getLogger("elasticsearch").setLevel(logging.WARNING)
-    logging.getLogger("urllib3").setLevel(logging.WARNING)
-    logging.getLogger("boto3").setLevel(logging.WARNING)
-    logging.getLogger("botocore").setLevel(logging.WARNING)
+    _configure_third_party_levels()
 
 
+@cache
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the specified name.
 
+    Loggers are memoized so repeated lookups skip the logging module lock.
+
     Args:
         name: Logger name (usually __name__)
 
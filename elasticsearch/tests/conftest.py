@@ -0,0 +1,68 @@
+"""Pytest configuration."""
+
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from elasticsearch.exceptions import ApiError
+
+# 与 main.py 一致，模块以 src 为根目录导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from models.config import SnapshotConfig  # noqa: E402
+
+
+@pytest.fixture
+def make_config():
+    """Build a SnapshotConfig from explicit test values."""
+
+    def _make(**overrides) -> SnapshotConfig:
+        values = {
+            "snapshot_hosts": "http://localhost:9200",
+            "restore_hosts": "http://localhost:9200",
+            "repository_name": "s3_test",
+            "indices": "logs-*",
+            "bucket_name": "test-bucket",
+            "region": "us-east-1",
+            "access_key": "test-key",
+            "secret_key": "test-secret",
+            "wait_for_completion": False,
+        }
+        values.update(overrides)
+        return SnapshotConfig(**values)
+
+    return _make
+
+
+@pytest.fixture
+def config(make_config) -> SnapshotConfig:
+    """Default test configuration."""
+    return make_config()
+
+
+@pytest.fixture
+def es_client() -> AsyncMock:
+    """Fake AsyncElasticsearch client."""
+    client = AsyncMock()
+    client.info.return_value = {"cluster_name": "test-cluster"}
+    client.snapshot.get_repository.return_value = {}
+    return client
+
+
+@pytest.fixture
+def api_error():
+    """Build an ApiError as returned by the client for a given HTTP status."""
+
+    def _make(status: int, message: str = "error") -> ApiError:
+        return ApiError(message, MagicMock(status=status), {})
+
+    return _make
+
+
+@pytest.fixture
+def no_sleep(monkeypatch) -> AsyncMock:
+    """Skip backoff delays and record them instead."""
+    sleep = AsyncMock()
+    monkeypatch.setattr("core._base.asyncio.sleep", sleep)
+    return sleep
@@ -0,0 +1,136 @@
+"""Tests for EsRepoBase."""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from core._base import DELETE_MAX_BACKOFF, EsRepoBase
+
+
+@pytest.fixture
+def handler(make_config, es_client) -> EsRepoBase:
+    handler = EsRepoBase(make_config(delete_batch_size=2, cleanup_concurrency=2))
+    handler.es_client = es_client
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_retry_delete_backs_off_on_503(handler, es_client, api_error, no_sleep):
+    es_client.snapshot.delete.side_effect = [api_error(503), api_error(503), None]
+
+    await handler._retry_delete("snap_1")
+
+    assert es_client.snapshot.delete.await_count == 3
+    assert [call.args[0] for call in no_sleep.await_args_list] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_retry_delete_backs_off_on_concurrent_execution(
+    handler, es_client, api_error, no_sleep
+):
+    es_client.snapshot.delete.side_effect = [
+        api_error(400, "concurrent_snapshot_execution_exception"),
+        None,
+    ]
+
+    await handler._retry_delete("snap_1")
+
+    assert es_client.snapshot.delete.await_count == 2
+    no_sleep.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_retry_delete_caps_backoff_and_gives_up(
+    handler, es_client, api_error, no_sleep
+):
+    es_client.snapshot.delete.side_effect = api_error(503)
+
+    with pytest.raises(Exception, match="503"):
+        await handler._retry_delete("snap_1", max_retries=6)
+
+    assert es_client.snapshot.delete.await_count == 7
+    delays = [call.args[0] for call in no_sleep.await_args_list]
+    assert delays == [1, 2, 4, 8, 16, DELETE_MAX_BACKOFF]
+
+
+@pytest.mark.asyncio
+async def test_retry_delete_does_not_retry_other_errors(
+    handler, es_client, api_error, no_sleep
+):
+    es_client.snapshot.delete.side_effect = api_error(400, "illegal_argument")
+
+    with pytest.raises(Exception, match="illegal_argument"):
+        await handler._retry_delete("snap_1")
+
+    es_client.snapshot.delete.assert_awaited_once()
+    no_sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_delete_snapshots_sends_chunks(handler, es_client):
+    progress = []
+
+    result = await handler.delete_snapshots(
+        ["a", "b", "c", "d", "e"], on_progress=progress.append
+    )
+
+    sent = [
+        call.kwargs["snapshot"] for call in es_client.snapshot.delete.await_args_list
+    ]
+    assert sent == ["a,b", "c,d", "e"]
+    assert result == {"deleted": ["a", "b", "c", "d", "e"], "failed": {}}
+    assert progress == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_delete_snapshots_falls_back_to_single_deletes(
+    handler, es_client, api_error
+):
+    def delete(repository, snapshot, request_timeout):
+        # 集群不支持批量删除，且其中一个快照删除失败
+        if "," in snapshot:
+            raise api_error(400, "multi-name delete not supported")
+        if snapshot == "bad":
+            raise api_error(500, "repository_exception")
+
+    es_client.snapshot.delete.side_effect = delete
+
+    result = await handler.delete_snapshots(["a", "bad", "c"], chunk_size=3)
+
+    sent = [
+        call.kwargs["snapshot"] for call in es_client.snapshot.delete.await_args_list
+    ]
+    assert sent[0] == "a,bad,c"
+    assert sorted(sent[1:]) == ["a", "bad", "c"]
+    assert result["deleted"] == ["a", "c"]
+    assert list(result["failed"]) == ["bad"]
+
+
+def test_snapshot_start_time_uses_millis_as_utc():
+    start = EsRepoBase.snapshot_start_time(
+        {"snapshot": "snapshot_20200101_000000", "start_time_in_millis": 0}
+    )
+
+    assert start == datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def test_snapshot_start_time_reads_local_name_as_utc():
+    start = EsRepoBase.snapshot_start_time({"snapshot": "snapshot_20250729_131212"})
+
+    assert start.tzinfo is UTC
+    assert start == datetime(2025, 7, 29, 13, 12, 12).astimezone(UTC)
+
+
+def test_snapshot_start_time_without_time_or_dated_name():
+    assert EsRepoBase.snapshot_start_time({"snapshot": "manual-backup"}) is None
+
+
+@pytest.mark.asyncio
+async def test_get_snapshot_status_returns_empty_when_missing(handler, es_client):
+    es_client.snapshot.get.side_effect = NotFoundError(
+        "snapshot_missing_exception", MagicMock(status=404), {}
+    )
+
+    assert await handler.get_snapshot_status("missing") == {}
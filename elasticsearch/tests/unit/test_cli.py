@@ -0,0 +1,45 @@
+"""Tests for the cleanup command."""
+
+from importlib import import_module
+
+import pytest
+from click.testing import CliRunner
+
+# cli 包导出的 main 函数会遮蔽同名子模块
+cli_main = import_module("cli.main")
+
+
+@pytest.fixture
+def run_cleanup(monkeypatch, config, es_client):
+    monkeypatch.setattr(cli_main, "load_config_from_env", lambda: config)
+    monkeypatch.setattr("core._base.AsyncElasticsearch", lambda **kwargs: es_client)
+    es_client.snapshot.get.return_value = {
+        "snapshots": [
+            {"snapshot": name}
+            for name in ("daily_1", "weekly_1", "monthly_1", "daily_2")
+        ]
+    }
+
+    def _run(*args: str):
+        return CliRunner().invoke(cli_main.cli, ["cleanup", *args])
+
+    return _run
+
+
+def test_cleanup_combines_repeated_patterns(run_cleanup, es_client):
+    result = run_cleanup("--pattern", "daily_*", "--pattern", "weekly_*", "--force")
+
+    assert result.exit_code == 0, result.output
+    es_client.snapshot.delete.assert_awaited_once()
+    assert es_client.snapshot.delete.await_args.kwargs["snapshot"] == (
+        "daily_1,weekly_1,daily_2"
+    )
+
+
+def test_cleanup_pattern_dry_run_deletes_nothing(run_cleanup, es_client):
+    result = run_cleanup("--pattern", "monthly_*", "--pattern", "yearly_*", "--dry-run")
+
+    assert result.exit_code == 0, result.output
+    assert "monthly_1" in result.output
+    assert "daily_1" not in result.output
+    es_client.snapshot.delete.assert_not_awaited()
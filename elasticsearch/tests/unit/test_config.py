@@ -0,0 +1,28 @@
+"""Tests for SnapshotConfig."""
+
+
+def test_snapshot_client_only_retries_connection_errors(config):
+    params = config.es_connection_params
+
+    assert params["retry_on_status"] == ()
+    assert "retry_on_timeout" not in params
+
+
+def test_restore_client_only_retries_connection_errors(config):
+    params = config.restore_connection_params
+
+    assert params["retry_on_status"] == ()
+    assert "retry_on_timeout" not in params
+
+
+def test_lists_drop_whitespace_and_empty_entries(make_config):
+    config = make_config(
+        snapshot_hosts=" http://a:9200, ,http://b:9200,",
+        restore_hosts="http://c:9200",
+        indices="logs-*, ,metrics-*,,",
+    )
+
+    assert config.snapshot_hosts_list == ["http://a:9200", "http://b:9200"]
+    assert config.restore_hosts_list == ["http://c:9200"]
+    assert config.indices_list == ["logs-*", "metrics-*"]
+    assert config.indices_normalized == "logs-*,metrics-*"
@@ -0,0 +1,87 @@
+"""Tests for snapshot repository registration in EsRepoBase."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from core._base import EsRepoBase, _same_repository
+
+
+@pytest.fixture
+def handler(config, es_client) -> EsRepoBase:
+    handler = EsRepoBase(config)
+    handler.es_client = es_client
+    return handler
+
+
+def _registered(handler: EsRepoBase, **settings) -> dict:
+    """Build a get_repository response for the handler's desired body."""
+    body = handler._repository_body()
+    # Elasticsearch 以字符串返回设置值
+    values = {
+        key: str(value).lower() if isinstance(value, bool) else str(value)
+        for key, value in {**body["settings"], **settings}.items()
+    }
+    return {handler.config.repository_name: {"type": body["type"], "settings": values}}
+
+
+def test_same_repository_compares_string_settings():
+    desired = {"type": "fs", "settings": {"location": "/snap", "compress": True}}
+
+    assert _same_repository(
+        {"type": "fs", "settings": {"location": "/snap", "compress": "true"}}, desired
+    )
+    assert not _same_repository(
+        {"type": "fs", "settings": {"location": "/old", "compress": "true"}}, desired
+    )
+    assert not _same_repository(
+        {"type": "s3", "settings": {"location": "/snap", "compress": "true"}}, desired
+    )
+
+
+@pytest.mark.asyncio
+async def test_ensure_repository_skips_matching_repository(handler, es_client):
+    es_client.snapshot.get_repository.return_value = _registered(handler)
+
+    await handler.ensure_repository()
+    await handler.ensure_repository()
+
+    es_client.snapshot.get_repository.assert_awaited_once()
+    es_client.snapshot.create_repository.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_ensure_repository_updates_changed_settings(handler, es_client):
+    es_client.snapshot.get_repository.return_value = _registered(
+        handler, bucket="old-bucket"
+    )
+
+    await handler.ensure_repository()
+
+    es_client.snapshot.create_repository.assert_awaited_once()
+    body = es_client.snapshot.create_repository.await_args.kwargs["body"]
+    assert body["settings"]["bucket"] == handler.config.bucket_name
+
+
+@pytest.mark.asyncio
+async def test_lookup_only_accepts_registered_repository(handler, es_client):
+    es_client.snapshot.get_repository.return_value = _registered(
+        handler, bucket="old-bucket"
+    )
+
+    await handler.ensure_repository(create_if_missing=False)
+
+    es_client.snapshot.create_repository.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_lookup_only_reports_missing_repository(handler, es_client):
+    es_client.snapshot.get_repository.side_effect = NotFoundError(
+        "repository_missing_exception", MagicMock(status=404), {}
+    )
+
+    with pytest.raises(RuntimeError, match="does not exist"):
+        await handler.ensure_repository(create_if_missing=False)
+
+    es_client.snapshot.create_repository.assert_not_awaited()
@@ -0,0 +1,124 @@
+"""Tests for SnapshotRotation."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from core.rotation import SnapshotRotation
+
+
+@pytest.fixture
+def rotation(config, es_client) -> SnapshotRotation:
+    rotation = SnapshotRotation(config)
+    rotation.es_client = es_client
+    return rotation
+
+
+@pytest.mark.asyncio
+async def test_iter_snapshots_follows_next_cursor(rotation, es_client):
+    es_client.snapshot.get.side_effect = [
+        {"snapshots": [{"snapshot": "c"}, {"snapshot": "b"}], "next": "cursor-1"},
+        {"snapshots": [{"snapshot": "a"}]},
+    ]
+
+    names = [s["snapshot"] async for s in rotation.iter_snapshots(page_size=2)]
+
+    assert names == ["c", "b", "a"]
+    first, second = (call.kwargs for call in es_client.snapshot.get.await_args_list)
+    assert first["size"] == second["size"] == 2
+    assert first["sort"] == "start_time" and first["order"] == "desc"
+    assert "after" not in first
+    assert second["after"] == "cursor-1"
+
+
+@pytest.mark.asyncio
+async def test_iter_snapshots_starts_from_sort_value(rotation, es_client):
+    es_client.snapshot.get.side_effect = [
+        {"snapshots": [{"snapshot": "b"}], "next": "cursor-1"},
+        {"snapshots": [{"snapshot": "a"}]},
+    ]
+
+    names = [
+        s["snapshot"]
+        async for s in rotation.iter_snapshots(page_size=1, from_sort_value=5000)
+    ]
+
+    assert names == ["b", "a"]
+    first, second = (call.kwargs for call in es_client.snapshot.get.await_args_list)
+    assert first["from_sort_value"] == "5000"
+    # 游标已隐含起始位置，后续页不再发送 from_sort_value
+    assert "from_sort_value" not in second
+    assert second["after"] == "cursor-1"
+
+
+@pytest.mark.asyncio
+async def test_list_snapshots_before_filters_on_start_time(rotation, es_client):
+    es_client.snapshot.get.side_effect = [
+        {
+            "snapshots": [
+                {"snapshot": "at_cutoff", "start_time_in_millis": 5000},
+                {"snapshot": "older", "start_time_in_millis": 4000},
+            ],
+            "next": "cursor-1",
+        },
+        {"snapshots": [{"snapshot": "oldest", "start_time_in_millis": 1000}]},
+    ]
+
+    snapshots = await rotation.list_snapshots_before(5000, page_size=2)
+
+    assert [s["snapshot"] for s in snapshots] == ["older", "oldest"]
+    first = es_client.snapshot.get.await_args_list[0].kwargs
+    assert first["from_sort_value"] == "5000"
+
+
+def _dated(name: str, days_ago: int, state: str = "SUCCESS") -> dict:
+    started = datetime.now(UTC) - timedelta(days=days_ago)
+    return {
+        "snapshot": name,
+        "state": state,
+        "start_time_in_millis": int(started.timestamp() * 1000),
+    }
+
+
+def test_plan_rotation_keeps_newest_within_age(rotation):
+    snapshots = [_dated("d40", 40), _dated("d1", 1), _dated("d3", 3), _dated("d2", 2)]
+
+    keep, delete = rotation.plan_rotation(snapshots, max_snapshots=2, max_age_days=30)
+
+    assert [s["name"] for s in keep] == ["d1", "d2"]
+    assert [(s["name"], s["reason"]) for s in delete] == [
+        ("d3", "Exceeds max_snapshots limit (2)"),
+        ("d40", "Exceeds max_snapshots limit (2)"),
+    ]
+
+
+def test_plan_rotation_deletes_expired_within_limit(rotation):
+    snapshots = [_dated("d1", 1), _dated("d40", 40), _dated("d50", 50)]
+
+    keep, delete = rotation.plan_rotation(snapshots, max_snapshots=5, max_age_days=30)
+
+    assert [s["name"] for s in keep] == ["d1"]
+    assert [(s["name"], s["reason"]) for s in delete] == [
+        ("d40", "Older than 30 days"),
+        ("d50", "Older than 30 days"),
+    ]
+
+
+def test_plan_rotation_skips_failed_and_undated(rotation):
+    snapshots = [
+        _dated("ok", 1),
+        _dated("failed", 2, state="FAILED"),
+        {"snapshot": "manual-backup", "state": "SUCCESS"},
+    ]
+
+    keep, delete = rotation.plan_rotation(snapshots, max_snapshots=1)
+
+    assert [s["name"] for s in keep] == ["ok"]
+    assert delete == []
+
+    keep, delete = rotation.plan_rotation(
+        snapshots, max_snapshots=1, keep_successful_only=False
+    )
+
+    assert [s["name"] for s in keep] == ["ok"]
+    assert [s["name"] for s in delete] == ["failed"]
@@ -0,0 +1,93 @@
+"""Tests for ElasticsearchSnapshot."""
+
+import time
+
+import pytest
+
+from core.snapshot import ElasticsearchSnapshot
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def _snapshot(name: str, days_ago: int) -> dict:
+    """Build a verbose listing entry that started ``days_ago`` days ago."""
+    now_ms = int(time.time() * 1000)
+    return {"snapshot": name, "start_time_in_millis": now_ms - days_ago * DAY_MS}
+
+
+@pytest.fixture
+def handler(config, es_client) -> ElasticsearchSnapshot:
+    # 与 SnapshotManager 一样直接共享客户端，未调用 connect()
+    handler = ElasticsearchSnapshot(config)
+    handler.es_client = es_client
+    return handler
+
+
+def _deleted(es_client) -> list[str]:
+    return [
+        name
+        for call in es_client.snapshot.delete.await_args_list
+        for name in call.kwargs["snapshot"].split(",")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_uses_verbose_listing(handler, es_client):
+    es_client.snapshot.get.return_value = {
+        "snapshots": [
+            _snapshot("s1", 1),
+            _snapshot("s5", 5),
+            _snapshot("s40", 40),
+            _snapshot("s60", 60),
+        ]
+    }
+
+    await handler.cleanup_old_snapshots(retention_days=30)
+
+    assert es_client.snapshot.get.await_args.kwargs["verbose"] is True
+    assert _deleted(es_client) == ["s40", "s60"]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_applies_count_and_days(handler, es_client):
+    es_client.snapshot.get.return_value = {
+        "snapshots": [
+            _snapshot("s40", 40),
+            _snapshot("s3", 3),
+            _snapshot("s2", 2),
+            _snapshot("s1", 1),
+        ]
+    }
+
+    await handler.cleanup_old_snapshots(retention_days=30, retention_count=2)
+
+    assert _deleted(es_client) == ["s3", "s40"]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_dates_snapshots_by_start_time_not_name(handler, es_client):
+    # 名称中不含日期的快照也按开始时间参与计数和排序
+    es_client.snapshot.get.return_value = {
+        "snapshots": [_snapshot("manual-backup", 10), _snapshot("nightly", 1)]
+    }
+
+    await handler.cleanup_old_snapshots(retention_count=1)
+
+    assert _deleted(es_client) == ["manual-backup"]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_skipped_without_retention_settings(handler, es_client):
+    await handler.cleanup_old_snapshots()
+
+    es_client.snapshot.get.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_leaves_shared_client_open(handler, es_client):
+    name = await handler.snapshot()
+
+    assert name.startswith("snapshot_")
+    es_client.snapshot.create.assert_awaited_once()
+    es_client.close.assert_not_awaited()
+    assert handler.es_client is es_client